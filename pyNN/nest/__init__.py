@@ -6,11 +6,17 @@ NEST v3 implementation of the PyNN API.
 :license: CeCILL, see LICENSE for details.
 """
 
+import os
 import warnings
-try:
-    import tables  # due to freeze when importing nest before tables
-except ImportError:
-    pass
+from collections import defaultdict
+if os.environ.get("PYNN_PRELOAD_TABLES"):
+    # historical workaround for a freeze when importing NEST 2.x before
+    # PyTables; not needed with NEST 3, but kept behind an environment
+    # variable in case the import-order problem resurfaces
+    try:
+        import tables
+    except ImportError:
+        pass
 import nest
 
 from . import simulator
@@ -20,16 +26,15 @@ from pyNN.common.control import DEFAULT_MAX_DELAY, DEFAULT_TIMESTEP, DEFAULT_MIN
 # if recording.MPI and (nest.Rank() != recording.mpi_comm.rank):
 #    raise Exception("MPI not working properly. Please make sure you import pyNN.nest before pyNN.random.")
 
+import concurrent.futures
+import importlib
 import shutil
 import logging
 
 from pyNN.nest.cells import NativeCellType, native_cell_type
 from pyNN.nest.electrodes import NativeElectrodeType, native_electrode_type
 from pyNN.nest.synapses import NativeSynapseType, native_synapse_type
-from pyNN.nest.standardmodels.cells import *
-from pyNN.nest.connectors import *
-from pyNN.nest.standardmodels.synapses import *
-from pyNN.nest.standardmodels.electrodes import *
+from pyNN.nest.simulator import state
 from pyNN.nest.recording import *
 from pyNN.random import NumpyRNG, GSLRNG
 from pyNN.nest.random import NativeRNG
@@ -40,24 +45,126 @@ from pyNN.nest.projections import Projection
 
 logger = logging.getLogger("PyNN")
 
+# pre-bound to avoid a module attribute lookup on every setup() call
+_nest_SetDefaults = nest.SetDefaults
+
+
+# The standard model, connector, synapse and electrode classes were formerly
+# pulled into this namespace by star imports at load time. They are now
+# imported lazily (PEP 562), on first attribute access, so that importing
+# pyNN.nest does not pay to build every class when a script only uses a few.
+_lazy_imports = {}
+for _module, _names in (
+    ("pyNN.nest.standardmodels.cells",
+     ("IF_curr_alpha", "IF_curr_exp", "IF_cond_alpha", "IF_cond_exp",
+      "IF_cond_exp_gsfa_grr", "IF_facets_hardware1", "HH_cond_exp",
+      "EIF_cond_alpha_isfa_ista", "EIF_cond_exp_isfa_ista",
+      "SpikeSourcePoisson", "SpikeSourcePoissonRefractory",
+      "SpikeSourceGamma", "SpikeSourceInhGamma", "SpikeSourceArray",
+      "Izhikevich", "GIF_cond_exp")),
+    ("pyNN.nest.connectors",
+     ("Connector", "AllToAllConnector", "FixedProbabilityConnector",
+      "OneToOneConnector", "FixedNumberPreConnector",
+      "FixedNumberPostConnector", "DistanceDependentProbabilityConnector",
+      "DisplacementDependentProbabilityConnector",
+      "IndexBasedProbabilityConnector", "SmallWorldConnector",
+      "FromListConnector", "FromFileConnector", "CloneConnector",
+      "ArrayConnector", "FixedTotalNumberConnector", "CSAConnector")),
+    ("pyNN.nest.standardmodels.synapses",
+     ("StaticSynapse", "STDPMechanism", "TsodyksMarkramSynapse",
+      "SimpleStochasticSynapse", "StochasticTsodyksMarkramSynapse",
+      "MultiQuantalSynapse", "AdditiveWeightDependence",
+      "MultiplicativeWeightDependence",
+      "AdditivePotentiationMultiplicativeDepression",
+      "GutigWeightDependence", "SpikePairRule")),
+    ("pyNN.nest.standardmodels.electrodes",
+     ("DCSource", "ACSource", "StepCurrentSource", "NoisyCurrentSource")),
+):
+    for _name in _names:
+        _lazy_imports[_name] = _module
+del _module, _names, _name
+
+__all__ = sorted(_lazy_imports) + [
+    "setup", "end", "run", "run_until", "run_for", "reset", "initialize",
+    "get_current_time", "get_time_step", "get_min_delay", "get_max_delay",
+    "num_processes", "rank", "create", "connect", "set", "record",
+    "record_v", "record_gsyn", "list_standard_models",
+    "validate_standard_models", "Population", "PopulationView", "Assembly",
+    "Projection", "NativeCellType", "native_cell_type",
+    "NativeElectrodeType", "native_electrode_type", "NativeSynapseType",
+    "native_synapse_type", "NumpyRNG", "GSLRNG", "NativeRNG", "Space",
+    "state"]
+
+
+def __getattr__(name):
+    if name == "connect":
+        # built lazily since it needs two of the lazily imported classes
+        connect = common.build_connect(Projection,
+                                       __getattr__("FixedProbabilityConnector"),
+                                       __getattr__("StaticSynapse"))
+        globals()["connect"] = connect
+        return connect
+    try:
+        module_name = _lazy_imports[name]
+    except KeyError:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    obj = getattr(importlib.import_module(module_name), name)
+    globals()[name] = obj  # cache, so later accesses bypass this hook
+    return obj
+
 
 # ==============================================================================
 #   Utility functions
 # ==============================================================================
 
 
+_STANDARD_CELL_TYPES = None
+
+
+def _get_standard_cell_types():
+    global _STANDARD_CELL_TYPES
+    if _STANDARD_CELL_TYPES is None:
+        cell_module = importlib.import_module("pyNN.nest.standardmodels.cells")
+        _STANDARD_CELL_TYPES = tuple(
+            obj for obj in vars(cell_module).values() if isinstance(obj, type)
+            and issubclass(obj, StandardCellType) and obj is not StandardCellType)
+    return _STANDARD_CELL_TYPES
+
+
 def list_standard_models():
     """Return a list of all the StandardCellType classes available for this simulator."""
-    standard_cell_types = [obj for obj in globals().values() if isinstance(
-        obj, type) and issubclass(obj, StandardCellType) and obj is not StandardCellType]
-    for cell_class in standard_cell_types:
+    return [cell_class.__name__ for cell_class in _get_standard_cell_types()]
+
+
+def validate_standard_models():
+    """
+    Return a list of all the StandardCellType classes that can actually be
+    instantiated with the available NEST installation.
+
+    Unlike `list_standard_models()`, this creates a cell of each type, which
+    requires a round-trip to the NEST kernel per class.
+    """
+    valid_cell_types = []
+    for cell_class in _get_standard_cell_types():
         try:
             create(cell_class())
         except Exception as e:
             print("Warning: %s is defined, but produces the following error: %s" %
                   (cell_class.__name__, e))
-            standard_cell_types.remove(cell_class)
-    return [obj.__name__ for obj in standard_cell_types]
+        else:
+            valid_cell_types.append(cell_class)
+    return [cell_class.__name__ for cell_class in valid_cell_types]
+
+
+try:
+    from numba import njit
+
+    @njit(cache=True)
+    def _delay_discrepancy(input_delay, output_delay, time_step):
+        return abs(input_delay - output_delay) < time_step
+except ImportError:
+    def _delay_discrepancy(input_delay, output_delay, time_step):
+        return abs(input_delay - output_delay) < time_step
 
 
 def _discrepancy_due_to_rounding(parameters, output_values):
@@ -70,15 +177,33 @@ def _discrepancy_due_to_rounding(parameters, output_values):
         # refactor the whole thing.
         input_delay = parameters['delay']
         if hasattr(output_values, "__len__"):
-            output_delay = output_values[parameters.keys().index('delay')]
+            # dicts preserve insertion order, so the position of 'delay' in
+            # `parameters` gives its position in `output_values`
+            output_delay = output_values[next(i for i, key in enumerate(parameters)
+                                              if key == 'delay')]
         else:
             output_delay = output_values
-        return abs(input_delay - output_delay) < get_time_step()
+        return _delay_discrepancy(float(input_delay), float(output_delay), get_time_step())
 
 # ==============================================================================
 #   Functions for simulation set-up and control
 # ==============================================================================
 
+# `extra_params` keys that map directly onto `simulator.state` attributes
+# (and do not touch the NEST kernel, unlike the keys handled by
+# `simulator.state.configure()`).
+# "t_flush" - see https://github.com/nest/nest-simulator/issues/1618
+_SIMPLE_STATE_KEYS = ("verbosity", "spike_precision",
+                      "recording_precision", "t_flush")
+
+# deprecated ways of specifying the kernel RNG seed, with their warnings
+_RNG_SEED_ALIASES = {
+    'grng_seed': "The setup argument 'grng_seed' is now 'rng_seed'",
+    'rng_seeds': "The setup argument 'rng_seeds' is no longer available. "
+                 "Taking the first value for the global seed.",
+    'rng_seeds_seed': "The setup argument 'rng_seeds_seed' is now 'rng_seed'"
+}
+
 
 def setup(timestep=DEFAULT_TIMESTEP, min_delay=DEFAULT_MIN_DELAY,
           **extra_params):
@@ -111,41 +236,52 @@ def setup(timestep=DEFAULT_TIMESTEP, min_delay=DEFAULT_MIN_DELAY,
     max_delay = extra_params.get('max_delay', DEFAULT_MAX_DELAY)
     common.setup(timestep, min_delay, **extra_params)
     simulator.state.clear()
-    for key in ("threads", "verbosity", "spike_precision", "recording_precision"):
+    for key in _SIMPLE_STATE_KEYS:
         if key in extra_params:
             setattr(simulator.state, key, extra_params[key])
-    # set kernel RNG seeds
     simulator.state.num_threads = extra_params.get('threads') or 1
-    if 'grng_seed' in extra_params:
-        warnings.warn("The setup argument 'grng_seed' is now 'rng_seed'")
-        simulator.state.rng_seed = extra_params['grng_seed']
-    if 'rng_seeds' in extra_params:
-        warnings.warn("The setup argument 'rng_seeds' is no longer available. Taking the first value for the global seed.")
-        simulator.state.rng_seed = extra_params['rng_seeds'][0]
-    if 'rng_seeds_seed' in extra_params:
-        warnings.warn("The setup argument 'rng_seeds_seed' is now 'rng_seed'")
-        simulator.state.rng_seed = extra_params['rng_seeds_seed']
-    else:
-        simulator.state.rng_seed = extra_params.get('rng_seed', 42)
-    if "t_flush" in extra_params:
-        # see https://github.com/nest/nest-simulator/issues/1618
-        simulator.state.t_flush = extra_params["t_flush"]
-    # set resolution
-    simulator.state.dt = timestep
-    # Set min_delay and max_delay
-    simulator.state.set_delays(min_delay, max_delay)
-    nest.SetDefaults('spike_generator', {'precise_times': True})
+    # determine the kernel RNG seed
+    rng_seed = None
+    for key, message in _RNG_SEED_ALIASES.items():
+        if key in extra_params:
+            warnings.warn(message)
+            value = extra_params[key]
+            rng_seed = value[0] if key == 'rng_seeds' else value
+    if 'rng_seeds_seed' not in extra_params:
+        rng_seed = extra_params.get('rng_seed', 42)
+    # set RNG seed, resolution, number of threads and delay limits
+    # with a single SetKernelStatus round-trip
+    kernel_params = {'dt': timestep, 'rng_seed': rng_seed}
+    if 'threads' in extra_params:
+        kernel_params['threads'] = extra_params['threads']
+    if min_delay != 'auto':
+        # this assumes we never set max_delay without also setting min_delay
+        kernel_params['min_delay'] = min_delay
+        kernel_params['max_delay'] = 10.0 if max_delay == 'auto' else max_delay
+    simulator.state.configure(kernel_params)
+    _nest_SetDefaults('spike_generator', {'precise_times': True})
     return rank()
 
 
 def end():
     """Do any necessary cleaning up before exiting."""
+    # group by filename so each output file is opened only once
+    write_on_end = defaultdict(list)
     for (population, variables, filename) in simulator.state.write_on_end:
         logger.debug("%s%s --> %s" % (population.label, variables, filename))
+        write_on_end[filename].append((population, variables))
+    for filename, entries in write_on_end.items():
         io = recording.get_io(filename)
-        population.write_data(io, variables)
-    for tempdir in simulator.state.tempdirs:
-        shutil.rmtree(tempdir)
+        for population, variables in entries:
+            population.write_data(io, variables)
+    tempdirs = simulator.state.tempdirs
+    if len(tempdirs) > 1:
+        # removing the temporary directories is I/O-bound, so do it in parallel
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(8, len(tempdirs))) as executor:
+            list(executor.map(shutil.rmtree, tempdirs))
+    elif tempdirs:
+        shutil.rmtree(tempdirs[0])
     simulator.state.tempdirs = []
     simulator.state.write_on_end = []
 
@@ -171,7 +307,8 @@ get_current_time, get_time_step, get_min_delay, get_max_delay, \
 
 create = common.build_create(Population)
 
-connect = common.build_connect(Projection, FixedProbabilityConnector, StaticSynapse)
+# `connect` is built lazily, in the module-level __getattr__ above, since it
+# depends on the lazily imported FixedProbabilityConnector and StaticSynapse
 
 set = common.set
 
@@ -6,6 +6,7 @@ Definition of NativeCellType class for NEST.
 :license: CeCILL, see LICENSE for details.
 """
 
+import functools
 import warnings
 import numpy as np
 import nest
@@ -20,70 +21,104 @@ UNITS_MAP = {
     'I_syn_in': 'pA'
 }
 
+# nest.GetDefaults crosses the Python/C++ boundary and materializes a large
+# dict each time, so fetch the defaults for a given model only once per session
+_get_nest_defaults = functools.lru_cache(maxsize=None)(nest.GetDefaults)
+
+_VALID_TYPES = (int, float, Sequence, np.ndarray)
+
+_STD_RECEPTORS = ('excitatory', 'inhibitory')
+
+_IGNORE = frozenset(
+    ['archiver_length', 'available', 'Ca', 'capacity', 'elementsize',
+     'frozen', 'instantiations', 'local', 'model', 'needs_prelim_update',
+     'recordables', 'state', 't_spike', 'tau_minus', 'tau_minus_triplet',
+     'thread', 'vp', 'receptor_types', 'events', 'global_id',
+     'element_type', 'type', 'type_id', 'has_connections', 'n_synapses',
+     'thread_local_id', 'node_uses_wfr', 'supports_precise_spikes',
+     'synaptic_elements', 'y_0', 'y_1', 'allow_offgrid_spikes', 'shift_now_spikes', 'post_trace'])
+
 
 def get_defaults(model_name):
-    valid_types = (int, float, Sequence, np.ndarray)
-    defaults = nest.GetDefaults(model_name)
-    variables = defaults.get('recordables', [])
-    ignore = ['archiver_length', 'available', 'Ca', 'capacity', 'elementsize',
-              'frozen', 'instantiations', 'local', 'model', 'needs_prelim_update',
-              'recordables', 'state', 't_spike', 'tau_minus', 'tau_minus_triplet',
-              'thread', 'vp', 'receptor_types', 'events', 'global_id',
-              'element_type', 'type', 'type_id', 'has_connections', 'n_synapses',
-              'thread_local_id', 'node_uses_wfr', 'supports_precise_spikes',
-              'synaptic_elements', 'y_0', 'y_1', 'allow_offgrid_spikes', 'shift_now_spikes', 'post_trace']
+    defaults = _get_nest_defaults(model_name)
+    variables = frozenset(defaults.get('recordables', ()))
     default_params = {}
     default_initial_values = {}
+    array_params = {}
     for name, value in defaults.items():
         if name in variables:
             default_initial_values[name] = value
-        elif name not in ignore:
-            if isinstance(value, valid_types):
-                default_params[name] = conversion.make_pynn_compatible(value)
+        elif name not in _IGNORE:
+            if isinstance(value, np.ndarray):
+                array_params[name] = value
+            elif isinstance(value, _VALID_TYPES):
+                # make_pynn_compatible() is the identity for scalar and
+                # Sequence values, so only arrays need converting
+                default_params[name] = value
             else:
                 warnings.warn("Ignoring parameter '%s' since PyNN does not support %s" %
                               (name, type(value)))
+    if array_params:
+        default_params.update(
+            zip(array_params, conversion.make_pynn_compatible(list(array_params.values()))))
     return default_params, default_initial_values
 
 
 def get_receptor_types(model_name):
-    return list(nest.GetDefaults(model_name).get("receptor_types", ('excitatory', 'inhibitory')))
+    return tuple(_get_nest_defaults(model_name).get("receptor_types", _STD_RECEPTORS))
 
 
 def get_recordables(model_name):
-    try:
-        return [name for name in nest.GetDefaults(model_name, "recordables")]
-    except nest.NESTError as err:
-        return []
+    return list(_get_nest_defaults(model_name).get("recordables", ()))
+
+
+_native_cell_type_cache = {}
 
 
 def native_cell_type(model_name):
     """
-    Return a new NativeCellType subclass.
+    Return a NativeCellType subclass for the given NEST model.
+
+    Repeated calls with the same `model_name` return the same class object,
+    rather than rebuilding the class (and its defaults and units dicts) from
+    scratch each time.
     """
     assert isinstance(model_name, str)
+    cell_type = _native_cell_type_cache.get(model_name)
+    if cell_type is not None:
+        return cell_type
     default_parameters, default_initial_values = get_defaults(model_name)
     receptor_types = get_receptor_types(model_name)
     recordable = get_recordables(model_name) + ['spikes']
-    element_type = nest.GetDefaults(model_name, 'element_type')
-    return type(model_name,
-                (NativeCellType,),
-                {'nest_model': model_name,
-                 'default_parameters': default_parameters,
-                 'default_initial_values': default_initial_values,
-                 'receptor_types': receptor_types,
-                 'injectable': ("V_m" in default_initial_values),
-                 'recordable': recordable,
-                 'units': dict(((var, UNITS_MAP.get(var, 'unknown')) for var in recordable)),
-                 'standard_receptor_type': (receptor_types == ['excitatory', 'inhibitory']),
-                 'nest_name': {"on_grid": model_name, "off_grid": model_name},
-                 'conductance_based': ("g" in (s[0] for s in recordable)),
-                 'always_local': element_type == 'stimulator',
-                 'uses_parrot': element_type == 'stimulator'
-                 })
+    element_type = _get_nest_defaults(model_name)['element_type']
+    units = {}
+    conductance_based = False
+    for var in recordable:
+        units[var] = UNITS_MAP.get(var, 'unknown')
+        if var.startswith('g'):
+            conductance_based = True
+    cell_type = type(model_name,
+                     (NativeCellType,),
+                     {'__slots__': (),
+                      'nest_model': model_name,
+                      'default_parameters': default_parameters,
+                      'default_initial_values': default_initial_values,
+                      'receptor_types': receptor_types,
+                      'injectable': ("V_m" in default_initial_values),
+                      'recordable': recordable,
+                      'units': units,
+                      'standard_receptor_type': (receptor_types == _STD_RECEPTORS),
+                      'nest_name': {"on_grid": model_name, "off_grid": model_name},
+                      'conductance_based': conductance_based,
+                      'always_local': element_type == 'stimulator',
+                      'uses_parrot': element_type == 'stimulator'
+                      })
+    _native_cell_type_cache[model_name] = cell_type
+    return cell_type
 
 
 class NativeCellType(BaseCellType):
+    __slots__ = ()
 
     def get_receptor_type(self, name):
-        return nest.GetDefaults(self.nest_model)["receptor_types"][name]
+        return _get_nest_defaults(self.nest_model)["receptor_types"][name]
@@ -71,6 +71,15 @@ def apply_time_offset(parameters, offset):
 class _State(common.control.BaseState):
     """Represent the simulator state."""
 
+    # translations from PyNN names to NEST kernel attributes, used by configure()
+    KERNEL_PARAMETER_TRANSLATIONS = {
+        'threads': ('local_num_threads', int),
+        'rng_seed': ('rng_seed', int),
+        'dt': ('resolution', float),
+        'min_delay': ('min_delay', float),
+        'max_delay': ('max_delay', float)
+    }
+
     def __init__(self):
         super(_State, self).__init__()
         try:
@@ -110,6 +119,23 @@ class _State(common.control.BaseState):
     rng_seed = nest_property('rng_seed', int)
     grng_seed = nest_property('rng_seed', int)
 
+    def configure(self, parameters):
+        """
+        Set several kernel parameters with a single SetKernelStatus call.
+
+        `parameters` maps PyNN names (e.g. "dt", "threads") to values; this
+        turns what would otherwise be one kernel round-trip per property
+        assignment into a single one.
+        """
+        kernel_parameters = {}
+        for name, value in parameters.items():
+            kernel_name, dtype = self.KERNEL_PARAMETER_TRANSLATIONS[name]
+            kernel_parameters[kernel_name] = dtype(value)
+        try:
+            nest.SetKernelStatus(kernel_parameters)
+        except nest.kernel.NESTError as e:
+            reraise(e, str(kernel_parameters))
+
     @property
     def min_delay(self):
         return nest.GetKernelStatus('min_delay')
@@ -5,11 +5,22 @@ from nose.tools import assert_equal, assert_not_equal, assert_raises
 import numpy as np
 from numpy.testing import assert_array_equal
 
-try:
-    import pyNN.nest
-    have_nest = True
-except ImportError:
-    have_nest = False
+import importlib.util
+
+# detect whether NEST is installed without paying to load the kernel,
+# so that runs which skip these tests stay fast
+have_nest = importlib.util.find_spec("nest") is not None
+
+sim = None
+nest = None
+
+
+def setup_module():
+    global sim, nest
+    if have_nest:
+        import pyNN.nest
+        import nest
+        sim = pyNN.nest
 
 from .scenarios.registry import registry
 from pyNN.utility import init_logging
@@ -21,7 +32,7 @@ def test_scenarios():
         if "nest" not in scenario.exclude:
             scenario.description = "{}(nest)".format(scenario.__name__)
             if have_nest:
-                yield scenario, pyNN.nest
+                yield scenario, sim
             else:
                 raise SkipTest
 
@@ -29,16 +40,14 @@ def test_scenarios():
 def test_record_native_model():
     if not have_nest:
         raise SkipTest
-    nest = pyNN.nest
-    from pyNN.random import RandomDistribution
 
     init_logging(logfile=None, debug=True)
 
-    nest.setup()
+    sim.setup()
 
     parameters = {'tau_m': 17.0}
     n_cells = 10
-    p1 = nest.Population(n_cells, nest.native_cell_type("ht_neuron")(**parameters))
+    p1 = sim.Population(n_cells, sim.native_cell_type("ht_neuron")(**parameters))
     p1.initialize(V_m=-70.0, Theta=-50.0)
     p1.set(theta_eq=-51.5)
     #assert_array_equal(p1.get('theta_eq'), -51.5*np.ones((10,)))
@@ -47,26 +56,26 @@ def test_record_native_model():
     p1.set(tau_m=RandomDistribution('uniform', low=15.0, high=20.0))
     print(p1.get('tau_m'))
 
-    current_source = nest.StepCurrentSource(times=[50.0, 110.0, 150.0, 210.0],
-                                            amplitudes=[0.01, 0.02, -0.02, 0.01])
+    current_source = sim.StepCurrentSource(times=[50.0, 110.0, 150.0, 210.0],
+                                           amplitudes=[0.01, 0.02, -0.02, 0.01])
     p1.inject(current_source)
 
-    p2 = nest.Population(1, nest.native_cell_type("poisson_generator")(rate=200.0))
+    p2 = sim.Population(1, sim.native_cell_type("poisson_generator")(rate=200.0))
 
     print("Setting up recording")
     p2.record('spikes')
     p1.record('V_m')
 
-    connector = nest.AllToAllConnector()
-    syn = nest.StaticSynapse(weight=0.001)
+    connector = sim.AllToAllConnector()
+    syn = sim.StaticSynapse(weight=0.001)
 
-    prj_ampa = nest.Projection(p2, p1, connector, syn, receptor_type='AMPA')
+    prj_ampa = sim.Projection(p2, p1, connector, syn, receptor_type='AMPA')
 
     tstop = 250.0
-    nest.run(tstop)
+    sim.run(tstop)
 
     vm = p1.get_data().segments[0].analogsignals[0]
-    n_points = int(tstop / nest.get_time_step()) + 1
+    n_points = int(tstop / sim.get_time_step()) + 1
     assert_equal(vm.shape, (n_points, n_cells))
     assert vm.max() > 0.0  # should have some spikes
 
@@ -74,37 +83,34 @@ def test_record_native_model():
 def test_native_stdp_model():
     if not have_nest:
         raise SkipTest
-    nest = pyNN.nest
-    from pyNN.utility import init_logging
 
     init_logging(logfile=None, debug=True)
 
-    nest.setup()
+    sim.setup()
 
-    p1 = nest.Population(10, nest.IF_cond_exp())
-    p2 = nest.Population(10, nest.SpikeSourcePoisson())
+    p1 = sim.Population(10, sim.IF_cond_exp())
+    p2 = sim.Population(10, sim.SpikeSourcePoisson())
 
     stdp_params = {'Wmax': 50.0, 'lambda': 0.015, 'weight': 0.001}
-    stdp = nest.native_synapse_type("stdp_synapse")(**stdp_params)
+    stdp = sim.native_synapse_type("stdp_synapse")(**stdp_params)
 
-    connector = nest.AllToAllConnector()
+    connector = sim.AllToAllConnector()
 
-    prj = nest.Projection(p2, p1, connector, receptor_type='excitatory',
-                          synapse_type=stdp)
+    prj = sim.Projection(p2, p1, connector, receptor_type='excitatory',
+                         synapse_type=stdp)
 
 
 def test_ticket240():
     if not have_nest:
         raise SkipTest
-    nest = pyNN.nest
-    nest.setup(threads=4)
+    sim.setup(threads=4)
     parameters = {'tau_m': 17.0}
-    p1 = nest.Population(4, nest.IF_curr_exp())
-    p2 = nest.Population(5, nest.native_cell_type("ht_neuron")(**parameters))
-    conn = nest.AllToAllConnector()
-    syn = nest.StaticSynapse(weight=1.0)
+    p1 = sim.Population(4, sim.IF_curr_exp())
+    p2 = sim.Population(5, sim.native_cell_type("ht_neuron")(**parameters))
+    conn = sim.AllToAllConnector()
+    syn = sim.StaticSynapse(weight=1.0)
     # This should be a nonstandard receptor type but I don't know of one to use.
-    prj = nest.Projection(p1, p2, conn, syn, receptor_type='AMPA')
+    prj = sim.Projection(p1, p2, conn, syn, receptor_type='AMPA')
     connections = prj.get(('weight',), format='list')
     assert len(connections) > 0
 
@@ -112,15 +118,14 @@ def test_ticket240():
 def test_ticket244():
     if not have_nest:
         raise SkipTest
-    nest = pyNN.nest
-    nest.setup(threads=4)
-    p1 = nest.Population(4, nest.IF_curr_exp())
+    sim.setup(threads=4)
+    p1 = sim.Population(4, sim.IF_curr_exp())
     p1.record('spikes')
-    poisson_generator = nest.Population(3, nest.SpikeSourcePoisson(rate=1000.0))
-    conn = nest.OneToOneConnector()
-    syn = nest.StaticSynapse(weight=1.0)
-    nest.Projection(poisson_generator, p1.sample(3), conn, syn, receptor_type="excitatory")
-    nest.run(15)
+    poisson_generator = sim.Population(3, sim.SpikeSourcePoisson(rate=1000.0))
+    conn = sim.OneToOneConnector()
+    syn = sim.StaticSynapse(weight=1.0)
+    sim.Projection(poisson_generator, p1.sample(3), conn, syn, receptor_type="excitatory")
+    sim.run(15)
     p1.get_data()
 
 
@@ -128,15 +133,14 @@ def test_ticket236():
     """Calling get_spike_counts() in the middle of a run should not stop spike recording"""
     if not have_nest:
         raise SkipTest
-    pynnn = pyNN.nest
-    pynnn.setup()
-    p1 = pynnn.Population(2, pynnn.IF_curr_alpha(), structure=pynnn.space.Grid2D())
+    sim.setup()
+    p1 = sim.Population(2, sim.IF_curr_alpha(), structure=sim.space.Grid2D())
     p1.record('spikes', to_file=False)
-    src = pynnn.DCSource(amplitude=70)
+    src = sim.DCSource(amplitude=70)
     src.inject_into(p1[:])
-    pynnn.run(50)
+    sim.run(50)
     s1 = p1.get_spike_counts()  # as expected, {1: 124, 2: 124}
-    pynnn.run(50)
+    sim.run(50)
     s2 = p1.get_spike_counts()  # unexpectedly, still {1: 124, 2: 124}
     assert s1[p1[0]] < s2[p1[0]]
 
@@ -144,7 +148,6 @@ def test_ticket236():
 def test_issue237():
     if not have_nest:
         raise SkipTest
-    sim = pyNN.nest
     n_exc = 10
     sim.setup()
     exc_noise_in_exc = sim.Population(n_exc, sim.SpikeSourcePoisson, {'rate': 1000.})
@@ -158,7 +161,6 @@ def test_issue237():
 def test_random_seeds():
     if not have_nest:
         raise SkipTest
-    sim = pyNN.nest
     data = []
     for seed in (854947309, 470924491):
         sim.setup(threads=1, rng_seed=seed)
@@ -172,8 +174,6 @@ def test_random_seeds():
 def test_tsodyks_markram_synapse():
     if not have_nest:
         raise SkipTest
-    import nest
-    sim = pyNN.nest
     sim.setup()
     spike_source = sim.Population(1, sim.SpikeSourceArray(spike_times=np.arange(10, 100, 10)))
     neurons = sim.Population(5, sim.IF_cond_exp(
@@ -197,7 +197,6 @@ def test_native_electrode_types():
     """ Test of NativeElectrodeType class. (See issue #506)"""
     if not have_nest:
         raise SkipTest
-    sim = pyNN.nest
     dt = 0.1
     sim.setup(timestep=0.1, min_delay=0.1)
     current_sources = [sim.DCSource(amplitude=0.5, start=50.0, stop=400.0),
@@ -237,8 +236,6 @@ def test_issue529():
     # A combination of NEST Common synapse properties and FromListConnector doesn't work
     if not have_nest:
         raise SkipTest
-    import nest
-    sim = pyNN.nest
 
     sim.setup()
 
@@ -279,8 +276,6 @@ def test_issue662a():
     """Setting tau_minus to a random distribution fails..."""
     if not have_nest:
         raise SkipTest
-    import nest
-    sim = pyNN.nest
 
     sim.setup()
     p1 = sim.Population(5, sim.SpikeSourcePoisson(rate=100.0))
@@ -304,8 +299,6 @@ def test_issue662b():
     """Setting tau_minus to a random distribution fails..."""
     if not have_nest:
         raise SkipTest
-    import nest
-    sim = pyNN.nest
 
     sim.setup(min_delay=0.5)
     p1 = sim.Population(5, sim.SpikeSourcePoisson(rate=100.0))
@@ -332,5 +325,6 @@ def test_issue662b():
 
 
 if __name__ == '__main__':
+    setup_module()
     #data = test_random_seeds()
     test_native_electrode_types()